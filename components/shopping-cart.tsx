@@ -142,7 +142,9 @@ export function ShoppingCart({
 
         // Check for RTL status in telemetry
         if (data.rtl_status) {
-          if (data.rtl_status.rtl_completed) {
+          if (data.rtl_status.mission_failed) {
+            setDeliveryStatus("❌ Mission aborted");
+          } else if (data.rtl_status.rtl_completed) {
             // Only complete when RTL is actually done
             setDeliveryStatus("✅ Delivery completed!");
             console.log("🎉 ShoppingCart: RTL completed, delivery finished");
@@ -1,77 +1,212 @@
-# server.py
+# prod_server.py
 import asyncio
+import contextlib
+import functools
+import itertools
 import logging
-from typing import Optional, Set
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks
-from pydantic import BaseModel, Field
+import math
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Annotated, Dict, Literal, Optional, Set, Union
+import orjson
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from mavsdk import System
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 
-# GPIO imports for servo control
-try:
-    import RPi.GPIO as GPIO
-    GPIO_AVAILABLE = True
-except ImportError:
-    GPIO_AVAILABLE = False
-    logging.warning("RPi.GPIO not available - servo control disabled")
+# Package servo; VAYU_SERVO=0 runs without it (e.g. against SITL via server.py)
+SERVO_ENABLED = os.getenv("VAYU_SERVO", "1") == "1"
+
+# Kernel PWM for servo control (pwm-gpio overlay or hardware PWM via sysfs),
+# e.g. dtoverlay=pwm-gpio,gpio=18 exposes GPIO18 as pwmchip0/pwm0
+PWM_CHIP = int(os.getenv("VAYU_PWM_CHIP", "0"))
+PWM_CHANNEL = int(os.getenv("VAYU_PWM_CHANNEL", "0"))
+PWM_CHIP_PATH = f"/sys/class/pwm/pwmchip{PWM_CHIP}"
+PWM_AVAILABLE = SERVO_ENABLED and os.path.isdir(PWM_CHIP_PATH)
+if SERVO_ENABLED and not PWM_AVAILABLE:
+    logging.warning(f"{PWM_CHIP_PATH} not available - servo control disabled")
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# libuv-backed event loop; uvicorn's --loop auto also picks it when installed
+try:
+    import uvloop
+    uvloop.install()
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+    logger.warning("uvloop not available - using default asyncio event loop")
+
+# Optional binary telemetry for clients that connect with ?fmt=msgpack
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Frontend origins allowed to call the API, comma separated (Next.js dev server by default)
+CORS_ORIGINS = os.getenv("VAYU_CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000").split(",")
+
+app = FastAPI(default_response_class=ORJSONResponse)
+# Static allowlist: the frontend only does GET and JSON POSTs
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
 )
 
 drone = System()
-telemetry_clients: Set[WebSocket] = set()
+telemetry_clients: Dict[WebSocket, "LatestSlot"] = {}
 flight_lock = asyncio.Lock()
+mission_counter = itertools.count(1)  # Mission IDs only need to be unique per process
+monitor_tasks: Dict[str, asyncio.Task] = {}  # Telemetry monitors by name, see start_monitor
+flight_tasks: Set[asyncio.Task] = set()  # Strong refs so running flights aren't GC'd
+position_rate_task: Optional[asyncio.Task] = None
+position_rate_hz: Optional[float] = None
+position_rate_lock = asyncio.Lock()  # One rate change at a time, see apply_position_rate
+# Last position sample (and its JSON), kept by telemetry_broadcaster
+latest_position = None
+latest_position_json: Optional[bytes] = None
+position_ready = asyncio.Event()
+position_updated = asyncio.Event()  # Set on every new sample, see next_position
+resend_frame = False  # Set when a client joins so the next frame isn't deduplicated
+# Set while GPS and home position are OK, kept by health_monitor
+health_ready = asyncio.Event()
+# Set while the drone is airborne, kept by in_air_monitor
+in_air = asyncio.Event()
+
+# Resend an unchanged telemetry frame at most this often (seconds)
+TELEMETRY_HEARTBEAT_S = 2.0
+# A client that can't take a frame within this long is considered dead (seconds)
+TELEMETRY_SEND_TIMEOUT_S = 2.0
+# Clients woken per event loop turn when fanning out a frame
+PUBLISH_BATCH_SIZE = 50
+# Telemetry connections beyond this are turned away so fan-out stays bounded
+MAX_CLIENTS = int(os.getenv("VAYU_MAX_CLIENTS", "256"))
+# Position stream rate while clients are watching or a flight is running,
+# and the trickle rate used when nobody needs it
+POSITION_RATE_HZ = 5.0
+IDLE_POSITION_RATE_HZ = 0.2
+# Wait this long after clients come or go before changing the rate (seconds)
+POSITION_RATE_DEBOUNCE_S = 1.0
+# Metres per degree of latitude (and of longitude at the equator)
+M_PER_DEG_LAT = 111_320.0
+# Horizontal distance at which the target counts as reached (metres)
+ARRIVAL_RADIUS_M = 5.0
+# Restart a telemetry monitor this long after it stops (seconds)
+MONITOR_RESTART_S = 1.0
+# A flight fails if no position sample arrives within this long (seconds)
+POSITION_SAMPLE_TIMEOUT_S = 10.0
+# How long a flight waits after takeoff for the drone to report it is airborne (seconds)
+TAKEOFF_TIMEOUT_S = 15.0
+# How long /drone/position waits for a first sample after startup (seconds)
+POSITION_WAIT_TIMEOUT_S = 5.0
+# Wire formats a telemetry client can pick with ?fmt= (json is the default)
+TELEMETRY_FORMATS = {"json", "raw"}
+if MSGPACK_AVAILABLE:
+    TELEMETRY_FORMATS.add("msgpack")
+# ?fmt=raw frame: 16 bytes, little-endian float32 lat, lon, abs_alt_m, rel_alt_m.
+# Position only; status and servo_update messages are not sent on this channel.
+RAW_FRAME = struct.Struct("<ffff")
 
 # Enhanced status tracking including servo
 mission_status = {
     "is_rtl_active": False,
     "rtl_completed": False,
+    "mission_failed": False,  # Mission aborted before RTL, e.g. takeoff never happened
     "mission_id": None,
     "servo_status": "closed",  # "closed", "opening", "open", "closing", "error"
     "package_dropped": False
 }
 
 # Servo configuration
-SERVO_PIN = 18
-SERVO_FREQ = 50
-servo_pwm = None
+SERVO_PERIOD_NS = 20_000_000  # 50Hz servo frame
+SERVO_RT_PRIORITY = 50  # SCHED_FIFO priority while actuating
+SERVO_TRAVEL_S = 1.0  # Time for the servo to reach a commanded position
+PACKAGE_DROP_S = 2.0  # Time the servo stays open for the package to fall
+HOVER_S = 3.0  # Hover after the drop before RTL
+
+# Optional CPU pinning, e.g. VAYU_CPU_AFFINITY=2 with isolcpus=2-3 nohz_full=2-3
+CPU_AFFINITY = os.getenv("VAYU_CPU_AFFINITY")
 
 def pwm_duty_cycle(microseconds):
-    """Convert microseconds to duty cycle percentage"""
-    return (microseconds / 20000.0) * 100.0
+    """Convert a pulse width in microseconds to a sysfs duty_cycle in nanoseconds"""
+    return int(microseconds * 1000)
+
+# Servo pulse widths, converted once: 1000us closed, 2000us open
+SERVO_CLOSED_DUTY_NS = pwm_duty_cycle(1000)
+SERVO_OPEN_DUTY_NS = pwm_duty_cycle(2000)
 
-class TriggerRequest(BaseModel):
-    target_lat: float = Field(..., ge=-90, le=90)
-    target_lon: float = Field(..., ge=-180, le=180)
-    altitude_m: Optional[float] = Field(None, gt=0)
+class SysfsPWM:
+    """Kernel PWM channel driven through /sys/class/pwm; edges are timed in-kernel"""
 
-# FIXED: Changed regex to pattern for Pydantic V2 compatibility
+    def __init__(self, chip_path: str, channel: int):
+        self.chip_path = chip_path
+        self.channel = channel
+        self.path = f"{chip_path}/pwm{channel}"
+
+    def _write(self, path: str, value: int):
+        with open(path, "w") as f:
+            f.write(str(value))
+
+    def start(self, period_ns: int, duty_ns: int):
+        if not os.path.isdir(self.path):
+            self._write(f"{self.chip_path}/export", self.channel)
+        self._write(f"{self.path}/period", period_ns)
+        self._write(f"{self.path}/duty_cycle", duty_ns)
+        self._write(f"{self.path}/enable", 1)
+
+    def set_duty_cycle(self, duty_ns: int):
+        self._write(f"{self.path}/duty_cycle", duty_ns)
+
+    def stop(self):
+        self._write(f"{self.path}/enable", 0)
+        self._write(f"{self.chip_path}/unexport", self.channel)
+
+class NullServo:
+    """Stand-in until a PWM channel is initialized; every actuation fails"""
+
+    def set_duty_cycle(self, duty_ns: int):
+        raise RuntimeError("Servo control not available")
+
+    def stop(self):
+        pass
+
+servo_pwm = NullServo()
+
+# Slotted dataclass validated through a TypeAdapter: no per-instance __dict__
+# or model bookkeeping for a request that is read once and dropped
+@dataclass(slots=True)
+class TriggerRequest:
+    target_lat: Annotated[float, Field(ge=-90, le=90)]
+    target_lon: Annotated[float, Field(ge=-180, le=180)]
+    altitude_m: Annotated[Optional[float], Field(gt=0)] = None
+
+TRIGGER_ADAPTER = TypeAdapter(TriggerRequest)
+
+# Literal is validated by pydantic-core directly instead of running a regex
 class ServoRequest(BaseModel):
-    action: str = Field(..., pattern="^(open|close)$")
+    action: Literal["open", "close"]
 
 def initialize_servo():
-    """Initialize servo GPIO"""
+    """Initialize servo PWM channel"""
     global servo_pwm
-    if not GPIO_AVAILABLE:
-        logger.warning("GPIO not available - servo control disabled")
+    if not PWM_AVAILABLE:
+        logger.warning("Kernel PWM not available - servo control disabled")
         return False
     
     try:
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(SERVO_PIN, GPIO.OUT)
-        servo_pwm = GPIO.PWM(SERVO_PIN, SERVO_FREQ)
-        servo_pwm.start(0)
-        # Set to closed position initially
-        servo_pwm.ChangeDutyCycle(pwm_duty_cycle(1000))
+        pwm = SysfsPWM(PWM_CHIP_PATH, PWM_CHANNEL)
+        # Start in closed position
+        pwm.start(SERVO_PERIOD_NS, SERVO_CLOSED_DUTY_NS)
+        servo_pwm = pwm
         mission_status["servo_status"] = "closed"
         logger.info("✅ Servo initialized and set to closed position")
         return True
@@ -80,6 +215,73 @@ def initialize_servo():
         mission_status["servo_status"] = "error"
         return False
 
+class LatestSlot:
+    """One-frame mailbox per client; a newer frame replaces one not yet sent"""
+
+    def __init__(self, fmt: str = "json"):
+        self.fmt = fmt
+        self.payload = ""
+        self.ready = asyncio.Event()
+
+    def put(self, payload: Union[str, bytes]):
+        self.payload = payload
+        self.ready.set()
+
+    async def get(self) -> Union[str, bytes]:
+        await self.ready.wait()
+        self.ready.clear()
+        return self.payload
+
+def client_formats() -> Set[str]:
+    """Wire formats requested by at least one connected client"""
+    return {slot.fmt for slot in telemetry_clients.values()}
+
+def pack_msgpack(msg: dict) -> bytes:
+    """MessagePack frame; float32 is ~1m at worst for lat/lon, plenty for a map"""
+    return msgpack.packb(msg, use_single_float=True)
+
+async def publish(frames: Dict[str, Union[str, bytes]]):
+    """Hand an already serialized frame to every connected client in its format"""
+    slots = list(telemetry_clients.values())
+    for start in range(0, len(slots), PUBLISH_BATCH_SIZE):
+        # Yield between batches so waking hundreds of senders doesn't starve HTTP handlers
+        if start:
+            await asyncio.sleep(0)
+        for slot in slots[start:start + PUBLISH_BATCH_SIZE]:
+            # Formats a message has no encoding in (e.g. servo updates on raw) are skipped
+            payload = frames.get(slot.fmt)
+            if payload is not None:
+                slot.put(payload)
+
+async def broadcast(msg: dict):
+    """Serialize a message once per format in use and hand it to every connected client"""
+    if not telemetry_clients:
+        return
+    
+    # orjson encodes in C; decode once so browsers still get a text frame
+    frames = {"json": orjson.dumps(msg).decode()}
+    if "msgpack" in client_formats():
+        frames["msgpack"] = pack_msgpack(msg)
+    await publish(frames)
+
+async def telemetry_sender(ws: WebSocket, slot: LatestSlot):
+    """Send one client's newest frame whenever it changes"""
+    try:
+        while True:
+            payload = await slot.get()
+            send = ws.send_bytes if isinstance(payload, bytes) else ws.send_text
+            await asyncio.wait_for(send(payload), TELEMETRY_SEND_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        logger.warning("Client send timed out, evicting it")
+        telemetry_clients.pop(ws, None)
+        try:
+            await asyncio.wait_for(ws.close(code=1011), TELEMETRY_SEND_TIMEOUT_S)
+        except Exception:
+            pass
+    except Exception as e:
+        logger.warning(f"Failed to send to client, dropping it: {e}")
+        telemetry_clients.pop(ws, None)
+
 # Add this function to your prod_server.py
 async def broadcast_servo_status():
     """Immediately broadcast servo status to all connected clients"""
@@ -95,37 +297,64 @@ async def broadcast_servo_status():
     }
     
     logger.info(f"📡 Broadcasting servo status: {mission_status['servo_status']}")
+    await broadcast(msg)
+
+def pin_cpu_affinity():
+    """
+    Pin the calling thread to the CPUs listed in VAYU_CPU_AFFINITY.
+    Threads and processes started afterwards inherit it, so call this before
+    drone.connect() spawns mavsdk_server and its gRPC threads.
+    """
+    if not CPU_AFFINITY:
+        return
     
-    # Send to all connected WebSocket clients
-    disconnected_clients = set()
-    for client in telemetry_clients:
-        try:
-            await client.send_json(msg)
-        except Exception as e:
-            logger.warning(f"Failed to send servo update: {e}")
-            disconnected_clients.add(client)
+    try:
+        cpus = {int(cpu) for cpu in CPU_AFFINITY.split(",")}
+        os.sched_setaffinity(0, cpus)
+        logger.info(f"📌 Pinned to CPUs {sorted(cpus)}")
+    except (AttributeError, ValueError, OSError) as e:
+        logger.warning(f"Could not set CPU affinity '{CPU_AFFINITY}': {e}")
+
+@contextlib.contextmanager
+def realtime_priority():
+    """Run the calling thread under SCHED_FIFO for the duration of the block"""
+    try:
+        policy, param = os.sched_getscheduler(0), os.sched_getparam(0)
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(SERVO_RT_PRIORITY))
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Could not raise servo priority: {e}")
+        yield
+        return
     
-    # Remove disconnected clients
-    for client in disconnected_clients:
-        telemetry_clients.discard(client)
+    try:
+        yield
+    finally:
+        os.sched_setscheduler(0, policy, param)
+
+async def sleep_until(deadline: float):
+    """Sleep until an absolute event loop time so scheduling delays don't accumulate"""
+    await asyncio.sleep(max(0.0, deadline - asyncio.get_running_loop().time()))
+
+def actuate_servo(duty_ns: int):
+    """Write a new pulse width under real-time priority; run via asyncio.to_thread"""
+    with realtime_priority():
+        servo_pwm.set_duty_cycle(duty_ns)
 
 # Update your existing control_servo function
-async def control_servo(action: str):
-    """Control servo open/close with status updates"""
-    if not GPIO_AVAILABLE or servo_pwm is None:
-        logger.warning("Servo control not available")
-        mission_status["servo_status"] = "error"
-        await broadcast_servo_status()  # NEW: Broadcast immediately
-        return False
-    
+async def control_servo(action: str, settled_at: Optional[float] = None):
+    """
+    Control servo open/close with status updates.
+    settled_at is the absolute loop time the move is complete; defaults to
+    SERVO_TRAVEL_S after the command is issued.
+    """
     try:
         if action == "open":
             logger.info("📦 Opening servo...")
             mission_status["servo_status"] = "opening"
             await broadcast_servo_status()  # NEW: Broadcast opening
             
-            servo_pwm.ChangeDutyCycle(pwm_duty_cycle(2000))
-            await asyncio.sleep(1)
+            await asyncio.to_thread(actuate_servo, SERVO_OPEN_DUTY_NS)
+            await sleep_until(settled_at if settled_at is not None else asyncio.get_running_loop().time() + SERVO_TRAVEL_S)
             
             mission_status["servo_status"] = "open"
             await broadcast_servo_status()  # NEW: Broadcast open
@@ -136,8 +365,8 @@ async def control_servo(action: str):
             mission_status["servo_status"] = "closing"
             await broadcast_servo_status()  # NEW: Broadcast closing
             
-            servo_pwm.ChangeDutyCycle(pwm_duty_cycle(1000))
-            await asyncio.sleep(1)
+            await asyncio.to_thread(actuate_servo, SERVO_CLOSED_DUTY_NS)
+            await sleep_until(settled_at if settled_at is not None else asyncio.get_running_loop().time() + SERVO_TRAVEL_S)
             
             mission_status["servo_status"] = "closed"
             await broadcast_servo_status()  # NEW: Broadcast closed
@@ -153,6 +382,9 @@ async def control_servo(action: str):
 
 @app.on_event("startup")
 async def startup_event():
+    # Pin to isolated CPUs (if configured) before MAVSDK starts its threads
+    pin_cpu_affinity()
+    
     logger.info("Connecting to PX4 via MAVSDK...")
     await drone.connect(system_address="udp://:14540")
     async for state in drone.core.connection_state():
@@ -161,70 +393,229 @@ async def startup_event():
             break
     
     # Initialize servo
-    initialize_servo()
+    if SERVO_ENABLED:
+        initialize_servo()
     
     # Ensure telemetry stream is enabled
-    await drone.telemetry.set_rate_position(5.0)  # 5Hz updates
+    await apply_position_rate()  # Idle rate until a client connects
     await drone.telemetry.set_rate_health(1.0)
+    
+    # Single shared position, health and in-air streams for clients and flights
+    for monitor in (telemetry_broadcaster, health_monitor, in_air_monitor):
+        start_monitor(monitor)
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Cleanup GPIO on shutdown"""
-    if GPIO_AVAILABLE and servo_pwm:
+    """Release the servo PWM channel on shutdown"""
+    if PWM_AVAILABLE:
         try:
             servo_pwm.stop()
-            GPIO.cleanup()
-            logger.info("🧹 GPIO cleaned up")
+            logger.info("🧹 Servo PWM released")
         except Exception as e:
-            logger.error(f"Error cleaning up GPIO: {e}")
+            logger.error(f"Error releasing servo PWM: {e}")
 
-@app.websocket("/ws/telemetry")
-async def telemetry_ws(ws: WebSocket):
-    await ws.accept()
-    client_id = f"{ws.client.host}:{ws.client.port}"
-    logger.info(f"WebSocket client {client_id} connected")
-    
-    telemetry_clients.add(ws)
+async def apply_position_rate(delay: float = 0.0):
+    """Match the MAVSDK position rate to demand: full while watched or flying"""
+    global position_rate_hz
+    await asyncio.sleep(delay)
     
+    # Serialized so a call that decided on the idle rate can't finish after a
+    # flight's call has seen the old cached rate and skipped
+    async with position_rate_lock:
+        rate = (
+            POSITION_RATE_HZ
+            if telemetry_clients or flight_lock.locked()
+            else IDLE_POSITION_RATE_HZ
+        )
+        if rate == position_rate_hz:
+            return
+        
+        # Unknown until the call succeeds; a failed or cancelled call is retried next time
+        position_rate_hz = None
+        try:
+            await drone.telemetry.set_rate_position(rate)
+            position_rate_hz = rate
+            logger.info(f"📶 Position stream rate set to {rate}Hz")
+        except Exception as e:
+            logger.warning(f"Failed to set position rate: {e}")
+
+def schedule_position_rate():
+    """Debounced apply_position_rate so quick reconnects don't churn the rate"""
+    global position_rate_task
+    if position_rate_task and not position_rate_task.done():
+        position_rate_task.cancel()
+    position_rate_task = asyncio.create_task(
+        apply_position_rate(POSITION_RATE_DEBOUNCE_S)
+    )
+
+async def telemetry_broadcaster():
+    """Consume the position stream once and fan it out to all clients"""
+    last_payload = None
+    last_sent = 0.0
+    status_key = None
+    status = {}
+    status_json = b""
+    # Per-sample callables bound once as locals
+    dumps, pack_raw, monotonic = orjson.dumps, RAW_FRAME.pack, time.monotonic
+    global latest_position, latest_position_json, resend_frame
     try:
-        # Send live position stream to this client
         async for pos in drone.telemetry.position():
-            if ws not in telemetry_clients:  # Client was removed
-                break
-                
-            msg = {
+            # Flat position object; cached for /drone/position and reused in frames
+            position = {
                 "lat": pos.latitude_deg,
                 "lon": pos.longitude_deg,
                 "abs_alt_m": pos.absolute_altitude_m,
                 "rel_alt_m": pos.relative_altitude_m,
-                "rtl_status": {
-                    "is_rtl_active": mission_status["is_rtl_active"],
-                    "rtl_completed": mission_status["rtl_completed"],
-                    "mission_id": mission_status["mission_id"],
-                },
-                # NEW: Add servo status to telemetry
-                "servo_status": {
-                    "status": mission_status["servo_status"],
-                    "package_dropped": mission_status["package_dropped"]
-                }
             }
+            position_json = dumps(position)
+            latest_position, latest_position_json = pos, position_json
+            position_ready.set()
+            position_updated.set()
             
-            try:
-                await ws.send_json(msg)
-            except Exception as e:
-                logger.warning(f"Failed to send to client {client_id}: {e}")
-                break
+            if not telemetry_clients:
+                continue
+            
+            # Status changes a few times per mission; only re-encode it when it does
+            key = (
+                mission_status["is_rtl_active"],
+                mission_status["rtl_completed"],
+                mission_status["mission_failed"],
+                mission_status["mission_id"],
+                mission_status["servo_status"],
+                mission_status["package_dropped"],
+            )
+            if key != status_key:
+                status_key = key
+                status = {
+                    "rtl_status": {
+                        "is_rtl_active": mission_status["is_rtl_active"],
+                        "rtl_completed": mission_status["rtl_completed"],
+                        "mission_failed": mission_status["mission_failed"],
+                        "mission_id": mission_status["mission_id"],
+                    },
+                    # NEW: Add servo status to telemetry
+                    "servo_status": {
+                        "status": mission_status["servo_status"],
+                        "package_dropped": mission_status["package_dropped"]
+                    }
+                }
+                status_json = dumps(status)
+            
+            # Position members with the cached status members spliced in
+            payload = (position_json[:-1] + b"," + status_json[1:]).decode()
+        
+            # Skip frames identical to the last one, e.g. while landed or hovering
+            now = monotonic()
+            if payload == last_payload and now - last_sent < TELEMETRY_HEARTBEAT_S and not resend_frame:
+                continue
+            last_payload, last_sent = payload, now
+            resend_frame = False
+            frames = {"json": payload}
+            formats = client_formats()
+            if "msgpack" in formats:
+                frames["msgpack"] = pack_msgpack({**position, **status})
+            if "raw" in formats:
+                frames["raw"] = pack_raw(
+                    pos.latitude_deg,
+                    pos.longitude_deg,
+                    pos.absolute_altitude_m,
+                    pos.relative_altitude_m,
+                )
+            await publish(frames)
+    finally:
+        # Nothing cached is current once the stream stops; wait for the restart
+        position_ready.clear()
+        latest_position = latest_position_json = None
+
+async def next_position():
+    """Wait for the broadcaster's next position sample; flights wait on this
+    instead of opening a second MAVSDK position subscription"""
+    position_updated.clear()
+    try:
+        await asyncio.wait_for(position_updated.wait(), POSITION_SAMPLE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"No position sample for {POSITION_SAMPLE_TIMEOUT_S:.0f}s") from None
+    return latest_position
+
+async def health_monitor():
+    """Track GPS/home readiness from a single health subscription"""
+    try:
+        async for health in drone.telemetry.health():
+            if health.is_global_position_ok and health.is_home_position_ok:
+                health_ready.set()
+            else:
+                health_ready.clear()
+    finally:
+        health_ready.clear()  # Unknown until the monitor is back
+
+async def in_air_monitor():
+    """Track whether the drone is airborne from a single in_air subscription"""
+    try:
+        async for airborne in drone.telemetry.in_air():
+            if airborne:
+                in_air.set()
+            else:
+                in_air.clear()
+    finally:
+        in_air.clear()  # Unknown until the monitor is back
+
+def start_monitor(monitor):
+    """Run a telemetry monitor coroutine function as a task that restarts if it stops"""
+    task = asyncio.create_task(monitor(), name=monitor.__name__)
+    task.add_done_callback(functools.partial(monitor_done, monitor))
+    monitor_tasks[monitor.__name__] = task
+
+def monitor_done(monitor, task: asyncio.Task):
+    """Log a stopped monitor and start it again; cancellation means shutdown"""
+    if task.cancelled():
+        return
+    if task.exception():
+        logger.error(f"❌ {task.get_name()} failed, restarting", exc_info=task.exception())
+    else:
+        logger.warning(f"{task.get_name()} stream ended, restarting")
+    asyncio.get_running_loop().call_later(MONITOR_RESTART_S, start_monitor, monitor)
+
+@app.websocket("/ws/telemetry")
+async def telemetry_ws(ws: WebSocket):
+    # ?fmt=msgpack gets the same frames as binary MessagePack instead of JSON text;
+    # ?fmt=raw gets fixed-layout RAW_FRAME position frames only
+    fmt = ws.query_params.get("fmt", "json")
+    if fmt not in TELEMETRY_FORMATS:
+        logger.warning(f"Rejecting telemetry client: unsupported format '{fmt}'")
+        await ws.close(code=1008)
+        return
+    
+    # Refuse before accepting so a full server spends nothing on the handshake
+    if len(telemetry_clients) >= MAX_CLIENTS:
+        logger.warning(f"Rejecting telemetry client: {MAX_CLIENTS} clients connected")
+        await ws.close(code=1013)
+        return
+    
+    await ws.accept()
+    client_id = f"{ws.client.host}:{ws.client.port}"
+    logger.info(f"WebSocket client {client_id} connected ({fmt})")
+    
+    slot = LatestSlot(fmt)
+    telemetry_clients[ws] = slot
+    # A new slot starts empty; have the broadcaster send the next sample even if unchanged
+    global resend_frame
+    resend_frame = True
+    schedule_position_rate()
+    sender = asyncio.create_task(telemetry_sender(ws, slot))
+    
+    try:
+        # Frames are pushed by telemetry_broadcaster; just wait for disconnect
+        while True:
+            await ws.receive_text()
                 
     except WebSocketDisconnect:
         logger.info(f"WebSocket client {client_id} disconnected normally")
     except Exception as e:
         logger.error(f"WebSocket error for client {client_id}: {e}")
-        try:
-            await ws.send_json({"error": str(e)})
-        except:
-            pass
     finally:
-        telemetry_clients.discard(ws)
+        telemetry_clients.pop(ws, None)
+        sender.cancel()
+        schedule_position_rate()
         logger.info(f"WebSocket client {client_id} removed from telemetry_clients")
 
 
@@ -255,195 +646,349 @@ async def get_servo_status():
     return {
         "servo_status": mission_status["servo_status"],
         "package_dropped": mission_status["package_dropped"],
-        "gpio_available": GPIO_AVAILABLE
+        "gpio_available": PWM_AVAILABLE
     }
 
+async def broadcast_mission_status():
+    """Immediately broadcast mission status; telemetry frames may have stopped"""
+    if not telemetry_clients:
+        return
+    
+    msg = {
+        "type": "mission_update",
+        "rtl_status": {
+            "is_rtl_active": mission_status["is_rtl_active"],
+            "rtl_completed": mission_status["rtl_completed"],
+            "mission_failed": mission_status["mission_failed"],
+            "mission_id": mission_status["mission_id"],
+        }
+    }
+    await broadcast(msg)
+
+async def land_now():
+    """Land where the drone is; last resort, so failures are only logged"""
+    try:
+        await drone.action.land()
+        logger.warning("🛬 Landing in place")
+    except Exception as e:
+        logger.error(f"❌ Land command failed: {e}")
+
+async def abort_takeoff():
+    """Stand down after a takeoff that was never confirmed: disarm, or land if airborne"""
+    try:
+        await drone.action.disarm()
+        logger.warning("🛑 Takeoff aborted, drone disarmed")
+    except Exception as e:
+        # PX4 refuses to disarm in the air (e.g. in_air_monitor missed the liftoff)
+        logger.warning(f"🛑 Takeoff aborted, disarm refused ({e}) - landing")
+        await land_now()
+
+async def fail_mission(armed: bool, airborne: bool):
+    """
+    Report a failed mission and bring the drone back safely: RTL (or land)
+    once airborne, disarm (or land) after an unconfirmed takeoff.
+    Runs under flight_lock so no new flight starts before the drone is commanded.
+    """
+    mission_status.update({
+        "is_rtl_active": False,
+        "rtl_completed": False,
+        "mission_failed": True,
+    })
+    await broadcast_mission_status()
+    
+    if airborne:
+        try:
+            await drone.action.return_to_launch()
+            logger.warning("🏠 Mission failed - returning to launch")
+        except Exception as e:
+            logger.error(f"❌ RTL command failed: {e}")
+            await land_now()
+    elif armed:
+        await abort_takeoff()
+
 async def fly_to_location(target_lat: float, target_lon: float, altitude_m: Optional[float]):
     """
     Enhanced flight function with automatic package drop:
     1. Takeoff
     2. Wait until target altitude is reached
     3. Then navigate to target location at that altitude
-    4. Hover, drop package, and RTL
+    4. Hover, drop package (unless VAYU_SERVO=0), and RTL
     """
-    import uuid
-    
     # Generate unique mission ID
-    mission_id = str(uuid.uuid4())
+    mission_id = f"m-{next(mission_counter)}"
     
-    async with flight_lock:
-        mission_status.update({
-            "is_rtl_active": False,
-            "rtl_completed": False,
-            "mission_id": mission_id,
-            "package_dropped": False
-        })
-        
-        logger.info(f"🔄 Reset mission status for new mission {mission_id}")
-        logger.info(f"Starting flight to {target_lat}, {target_lon}")
-        logger.info(
-            f"Requested altitude: {altitude_m}m {'(above home ground)' if altitude_m else '(current altitude)'}"
-        )
-        
-        # Wait for GPS/home
-        async for health in drone.telemetry.health():
-            if health.is_global_position_ok and health.is_home_position_ok:
+    try:
+        async with flight_lock:
+            # Flight control needs the full-rate position stream
+            await apply_position_rate()
+            
+            mission_status.update({
+                "is_rtl_active": False,
+                "rtl_completed": False,
+                "mission_failed": False,
+                "mission_id": mission_id,
+                "package_dropped": False
+            })
+            
+            logger.info(f"🔄 Reset mission status for new mission {mission_id}")
+            logger.info(f"Starting flight to {target_lat}, {target_lon}")
+            logger.info(
+                f"Requested altitude: {altitude_m}m {'(above home ground)' if altitude_m else '(current altitude)'}"
+            )
+            
+            # What fail_mission has to undo if any step below raises
+            armed = airborne = False
+            try:
+                # Wait for GPS/home
+                await health_ready.wait()
                 logger.info("GPS and home position ready")
-                break
 
-        # Get home position absolute altitude
-        async for terrain_info in drone.telemetry.home():
-            home_absolute_altitude = terrain_info.absolute_altitude_m
-            logger.info(f"Home ground level: {home_absolute_altitude:.1f}m AMSL")
-            break
-            
-        # Calculate target absolute altitude
-        if altitude_m is not None:
-            target_abs_alt = home_absolute_altitude + altitude_m
-            logger.info(f"✅ Target altitude: {altitude_m}m above home ground")
-            logger.info(f"✅ Target absolute altitude: {target_abs_alt:.1f}m AMSL")
-        else:
-            async for pos in drone.telemetry.position():
-                target_abs_alt = pos.absolute_altitude_m
-                break
-            logger.info(f"✅ Using current altitude: {target_abs_alt:.1f}m AMSL")
-
-        # Safety check
-        min_safe_altitude = home_absolute_altitude + 5
-        if target_abs_alt < min_safe_altitude:
-            logger.warning(f"⚠️ Target altitude too low, using {min_safe_altitude:.1f}m")
-            target_abs_alt = min_safe_altitude
-
-        # Arm + takeoff
-        logger.info("🚁 Arming and taking off...")
-        await drone.action.arm()
-        await drone.action.takeoff()
-
-        # Wait until drone reaches target altitude
-        logger.info(f"⬆️ Climbing to target altitude: {target_abs_alt:.1f}m AMSL...")
-        
-        # Get current position after takeoff
-        current_lat, current_lon = None, None
-        async for pos in drone.telemetry.position():
-            current_lat = pos.latitude_deg
-            current_lon = pos.longitude_deg
-            current_alt = pos.absolute_altitude_m
-            logger.info(f"Current position after takeoff: {current_alt:.1f}m AMSL")
-            break
+                # Get home position absolute altitude
+                async for terrain_info in drone.telemetry.home():
+                    home_absolute_altitude = terrain_info.absolute_altitude_m
+                    logger.info(f"Home ground level: {home_absolute_altitude:.1f}m AMSL")
+                    break
+                    
+                # Calculate target absolute altitude
+                if altitude_m is not None:
+                    target_abs_alt = home_absolute_altitude + altitude_m
+                    logger.info(f"✅ Target altitude: {altitude_m}m above home ground")
+                    logger.info(f"✅ Target absolute altitude: {target_abs_alt:.1f}m AMSL")
+                else:
+                    # A fresh sample: the cached one can be from the idle rate, seconds old
+                    target_abs_alt = (await next_position()).absolute_altitude_m
+                    logger.info(f"✅ Using current altitude: {target_abs_alt:.1f}m AMSL")
 
-        # Command drone to target altitude at current location if needed
-        if abs(current_alt - target_abs_alt) > 2:
-            logger.info(f"🎯 Adjusting altitude from {current_alt:.1f}m to {target_abs_alt:.1f}m at current location")
-            await drone.action.goto_location(current_lat, current_lon, target_abs_alt, 0)
+                # Safety check
+                min_safe_altitude = home_absolute_altitude + 5
+                if target_abs_alt < min_safe_altitude:
+                    logger.warning(f"⚠️ Target altitude too low, using {min_safe_altitude:.1f}m")
+                    target_abs_alt = min_safe_altitude
 
-        # Wait until target altitude is reached
-        logger.info("⏳ Waiting to reach target altitude before proceeding to target location...")
-        altitude_reached = False
-        while not altitude_reached:
-            async for pos in drone.telemetry.position():
-                current_alt = pos.absolute_altitude_m
-                altitude_diff = abs(current_alt - target_abs_alt)
+                # Arm + takeoff
+                logger.info("🚁 Arming and taking off...")
+                await drone.action.arm()
+                armed = True
+                await drone.action.takeoff()
                 
-                if altitude_diff < 1.0:  # Within 1m of target altitude
-                    logger.info(f"✅ Target altitude reached: {current_alt:.1f}m AMSL (±{altitude_diff:.1f}m)")
-                    altitude_reached = True
-                    break
-                else:
-                    logger.info(f"🔄 Climbing... Current: {current_alt:.1f}m, Target: {target_abs_alt:.1f}m (diff: {altitude_diff:.1f}m)")
-                    await asyncio.sleep(1)
-                break
+                # Move on as soon as the drone leaves the ground; earlier gotos can be ignored
+                try:
+                    await asyncio.wait_for(in_air.wait(), TAKEOFF_TIMEOUT_S)
+                except asyncio.TimeoutError:
+                    raise RuntimeError(f"Drone not airborne {TAKEOFF_TIMEOUT_S:.0f}s after takeoff") from None
+                airborne = True
+                logger.info("🛫 Airborne")
+
+                # Wait until drone reaches target altitude
+                logger.info(f"⬆️ Climbing to target altitude: {target_abs_alt:.1f}m AMSL...")
+                
+                # Every wait from here to hover runs on the broadcaster's samples
 
-        # NOW navigate to target location at the established altitude
-        logger.info(f"➡️ Proceeding to target location at {target_abs_alt:.1f}m altitude")
-        logger.info(f"🎯 Flying to target: {target_lat:.6f}, {target_lon:.6f}")
-        await drone.action.goto_location(target_lat, target_lon, target_abs_alt, 0)
+                # Get current position after takeoff
+                pos = await next_position()
+                current_lat = pos.latitude_deg
+                current_lon = pos.longitude_deg
+                current_alt = pos.absolute_altitude_m
+                logger.info(f"Current position after takeoff: {current_alt:.1f}m AMSL")
 
-        # Wait until close to target (horizontal distance)
-        logger.info("📍 Monitoring approach to target location...")
-        async for pos in drone.telemetry.position():
-            dlat = pos.latitude_deg - target_lat
-            dlon = pos.longitude_deg - target_lon
-            approx_m = ((dlat * 111_320) ** 2 + (dlon * 100_000) ** 2) ** 0.5
-            
-            if approx_m < 5:
-                logger.info(f"✅ Reached target location (within {approx_m:.1f}m)")
-                break
-
-        # Hover at 1m above home ground level
-        logger.info("⬇️ Descending to hover altitude...")
-        hover_altitude = home_absolute_altitude + 1.0
-        logger.info(f"🎯 Hover altitude: {hover_altitude:.1f}m AMSL (1m above home ground)")
-        await drone.action.goto_location(target_lat, target_lon, hover_altitude, 0)
-        
-        # Wait for hover altitude
-        logger.info("⏳ Waiting to reach hover altitude...")
-        async for pos in drone.telemetry.position():
-            current_height_above_home = pos.absolute_altitude_m - home_absolute_altitude
-            if abs(current_height_above_home - 1.0) < 0.5:
-                logger.info(f"✅ At hover altitude: {current_height_above_home:.1f}m above home")
-                break
-        
-        # NEW: Automatic package drop during hover
-        logger.info("📦 PACKAGE DROP - Opening servo for delivery...")
-        if mission_status["servo_status"] == "closed":
-            await control_servo("open")
-            await asyncio.sleep(2)  # Wait for package to drop
-            await control_servo("close")
-            mission_status["package_dropped"] = True
-            logger.info("✅ Package dropped and servo closed")
-        else:
-            logger.warning("⚠️ Servo not in closed position - skipping automatic drop")
-        
-        # Hover for 3 seconds
-        logger.info("⏰ Hovering for 3 seconds...")
-        await asyncio.sleep(3)
-        
-        # Return to launch
-        logger.info("🏠 RTL TRIGGERED - Returning to launch position...")
-        mission_status.update({
-            "is_rtl_active": True, 
-            "rtl_completed": False, 
-            "mission_id": mission_id
-        })
-        
-        await drone.action.return_to_launch()
-        
-        # Monitor RTL progress
-        logger.info("📡 Monitoring RTL progress...")
-        rtl_timeout = 0
-        async for flight_mode in drone.telemetry.flight_mode():
-            logger.info(f"Flight mode: {flight_mode}")
-            rtl_timeout += 1
-            
-            if flight_mode == "LAND" or rtl_timeout > 100:
-                logger.info("✅ RTL completed, drone landing at home position")
+                # Command drone to target altitude at current location if needed
+                if abs(current_alt - target_abs_alt) > 2:
+                    logger.info(f"🎯 Adjusting altitude from {current_alt:.1f}m to {target_abs_alt:.1f}m at current location")
+                    await drone.action.goto_location(current_lat, current_lon, target_abs_alt, 0)
+
+                # Wait until target altitude is reached
+                logger.info("⏳ Waiting to reach target altitude before proceeding to target location...")
+                while True:
+                    pos = await next_position()
+                    current_alt = pos.absolute_altitude_m
+                    altitude_diff = abs(current_alt - target_abs_alt)
+                    
+                    if altitude_diff < 1.0:  # Within 1m of target altitude
+                        logger.info(f"✅ Target altitude reached: {current_alt:.1f}m AMSL (±{altitude_diff:.1f}m)")
+                        break
+                    
+                    # Positions arrive at the stream rate, no extra polling delay needed
+                    # Per-sample progress: DEBUG with lazy args so INFO skips formatting
+                    logger.debug("🔄 Climbing... Current: %.1fm, Target: %.1fm (diff: %.1fm)", current_alt, target_abs_alt, altitude_diff)
+
+                # NOW navigate to target location at the established altitude
+                logger.info(f"➡️ Proceeding to target location at {target_abs_alt:.1f}m altitude")
+                logger.info(f"🎯 Flying to target: {target_lat:.6f}, {target_lon:.6f}")
+                await drone.action.goto_location(target_lat, target_lon, target_abs_alt, 0)
+
+                # Wait until close to target (horizontal distance)
+                logger.info("📍 Monitoring approach to target location...")
+                # Equirectangular approximation; a degree of longitude shrinks with cos(lat).
+                # Constants are bound to locals so the per-sample check avoids global lookups.
+                m_per_deg_lat = M_PER_DEG_LAT
+                m_per_deg_lon = m_per_deg_lat * math.cos(math.radians(target_lat))
+                arrival_radius_sq = ARRIVAL_RADIUS_M ** 2
+                while True:
+                    pos = await next_position()
+                    dy = (pos.latitude_deg - target_lat) * m_per_deg_lat
+                    dx = (pos.longitude_deg - target_lon) * m_per_deg_lon
+                    dist_sq = dx * dx + dy * dy
+                    
+                    # Compare squared distances; the square root is only needed for the log
+                    if dist_sq < arrival_radius_sq:
+                        logger.info(f"✅ Reached target location (within {math.sqrt(dist_sq):.1f}m)")
+                        break
+
+                # Hover at 1m above home ground level
+                logger.info("⬇️ Descending to hover altitude...")
+                hover_altitude = home_absolute_altitude + 1.0
+                logger.info(f"🎯 Hover altitude: {hover_altitude:.1f}m AMSL (1m above home ground)")
+                await drone.action.goto_location(target_lat, target_lon, hover_altitude, 0)
+                
+                # Wait for hover altitude
+                logger.info("⏳ Waiting to reach hover altitude...")
+                while True:
+                    pos = await next_position()
+                    current_height_above_home = pos.absolute_altitude_m - home_absolute_altitude
+                    if abs(current_height_above_home - 1.0) < 0.5:
+                        logger.info(f"✅ At hover altitude: {current_height_above_home:.1f}m above home")
+                        break
+                
+                # NEW: Automatic package drop during hover
+                # Schedule the whole open -> drop -> close -> hover sequence from one
+                # start time so delays in one stage don't push back the others
+                start = asyncio.get_running_loop().time()
+                hover_end = start + HOVER_S
+                if SERVO_ENABLED:
+                    logger.info("📦 PACKAGE DROP - Opening servo for delivery...")
+                    if mission_status["servo_status"] == "closed":
+                        opened_at = start + SERVO_TRAVEL_S
+                        close_at = opened_at + PACKAGE_DROP_S
+                        hover_end = close_at + HOVER_S
+                        await control_servo("open", opened_at)
+                        await sleep_until(close_at)  # Wait for package to drop
+                        
+                        # The servo closes during the hover; both finish before RTL
+                        logger.info("⏰ Hovering for 3 seconds...")
+                        async with asyncio.TaskGroup() as tg:
+                            tg.create_task(control_servo("close", close_at + SERVO_TRAVEL_S))
+                            tg.create_task(sleep_until(hover_end))
+                        mission_status["package_dropped"] = True
+                        logger.info("✅ Package dropped and servo closed")
+                    else:
+                        logger.warning("⚠️ Servo not in closed position - skipping automatic drop")
+                
+                # Hover for 3 seconds (already elapsed if the drop overlapped it)
+                if asyncio.get_running_loop().time() < hover_end:
+                    logger.info("⏰ Hovering for 3 seconds...")
+                    await sleep_until(hover_end)
+                
+                # Return to launch
+                logger.info("🏠 RTL TRIGGERED - Returning to launch position...")
                 mission_status.update({
-                    "is_rtl_active": False,
-                    "rtl_completed": True,
-                    "mission_id": mission_id,
+                    "is_rtl_active": True, 
+                    "rtl_completed": False, 
+                    "mission_id": mission_id
                 })
-                break
-            
-            await asyncio.sleep(1)
-        
-        logger.info("🎉 Flight sequence complete!")
+                
+                await drone.action.return_to_launch()
+                
+                # Monitor RTL progress
+                logger.info("📡 Monitoring RTL progress...")
+                rtl_timeout = 0
+                async for flight_mode in drone.telemetry.flight_mode():
+                    logger.debug("Flight mode: %s", flight_mode)
+                    rtl_timeout += 1
+                    
+                    if flight_mode == "LAND" or rtl_timeout > 100:
+                        logger.info("✅ RTL completed, drone landing at home position")
+                        mission_status.update({
+                            "is_rtl_active": False,
+                            "rtl_completed": True,
+                            "mission_id": mission_id,
+                        })
+                        break
+                    
+                    await asyncio.sleep(1)
+                
+                logger.info("🎉 Flight sequence complete!")
+            except Exception:
+                await fail_mission(armed, airborne)
+                raise
+    finally:
+        # Back to the idle rate once nobody needs it, even if the flight failed
+        schedule_position_rate()
 
-@app.post("/trigger")
-async def trigger_drone(req: TriggerRequest, background_tasks: BackgroundTasks):
+def flight_done(task: asyncio.Task):
+    """Drop a finished flight task and log it if it failed"""
+    flight_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error("❌ Flight failed", exc_info=task.exception())
+
+# Body schema for the docs, built once since the handler reads the raw body
+TRIGGER_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": TRIGGER_ADAPTER.json_schema()}},
+    }
+}
+
+@app.post("/trigger", openapi_extra=TRIGGER_OPENAPI)
+async def trigger_drone(request: Request):
+    # Parse and validate the raw body in pydantic-core in one pass
+    try:
+        req = TRIGGER_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        )
+    
     logger.info(f"Received flight request: {req.target_lat}, {req.target_lon}, alt={req.altitude_m}")
-    background_tasks.add_task(fly_to_location, req.target_lat, req.target_lon, req.altitude_m)
+    # Start the flight now rather than after the response passes back through middleware
+    task = asyncio.create_task(fly_to_location(req.target_lat, req.target_lon, req.altitude_m))
+    flight_tasks.add(task)
+    task.add_done_callback(flight_done)
     return {"status": "accepted", "target": [req.target_lat, req.target_lon]}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Connection counts for monitoring and autoscaling"""
+    return {
+        "telemetry_clients": len(telemetry_clients),
+        "max_clients": MAX_CLIENTS,
+    }
+
 @app.get("/drone/position")
 async def get_drone_position():
-    """Get current drone position"""
-    try:
-        async for pos in drone.telemetry.position():
-            return {
-                "lat": pos.latitude_deg,
-                "lon": pos.longitude_deg,
-                "abs_alt_m": pos.absolute_altitude_m,
-                "rel_alt_m": pos.relative_altitude_m,
-            }
-    except Exception as e:
-        return {"error": str(e)}
+    """Get last known drone position from the shared telemetry stream"""
+    if latest_position_json is None:
+        try:
+            await asyncio.wait_for(position_ready.wait(), POSITION_WAIT_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            return ORJSONResponse({"error": "No position received yet"})
+    
+    # Already serialized by the broadcaster
+    return Response(latest_position_json, media_type="application/json")
+
+if __name__ == "__main__":
+    from importlib.util import find_spec
+    import uvicorn
+
+    # httptools and websockets come with uvicorn[standard]; fall back like uvloop
+    HTTP_IMPL = "httptools" if find_spec("httptools") else "h11"
+    WS_IMPL = "websockets" if find_spec("websockets") else "auto"
+    if HTTP_IMPL != "httptools" or WS_IMPL != "websockets":
+        logger.warning(f"uvicorn[standard] extras missing - using http={HTTP_IMPL}, ws={WS_IMPL}")
+
+    # One worker: mission state and the MAVSDK connection live in this process.
+    # Pings evict TCP-dead clients the send timeout alone would miss while idle.
+    # Frames are ~200 bytes, so per-client deflate costs more CPU than it saves;
+    # clients never send anything large, so inbound frames are capped at 64 KiB.
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop" if UVLOOP_AVAILABLE else "asyncio",
+        http=HTTP_IMPL,
+        ws=WS_IMPL,
+        ws_ping_interval=10.0,
+        ws_ping_timeout=5.0,
+        ws_per_message_deflate=False,
+        ws_max_size=65536,
+        workers=1,
+    )